@@ -4,13 +4,245 @@ Automated Assignment Scoring System
 This script evaluates student assignments using AI and generates structured feedback.
 """
 
+import io
 import os
+import re
+import gzip
 import json
-import anthropic
+import time
+import copy
+import shelve
+import asyncio
+import hashlib
+import zipfile
+import argparse
+import importlib.util
+import concurrent.futures
+import xml.etree.ElementTree as ET
 from pathlib import Path
-from docx import Document
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, BinaryIO, Tuple, Union
+
+import anthropic
+import numpy as np
+import orjson
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+
+# Streamed run summary, one evaluation per line
+SUMMARY_FILE_NAME = "all_evaluations.jsonl"
+# Gzip-compressed raw AI responses, one <student>.txt.gz per evaluation
+RAW_DIR_NAME = "raw"
+# Evaluations keyed like the response cache (SHA-256 of model, max_tokens and full prompt), reused across file names and runs
+BY_HASH_DIR_NAME = "by_hash"
+# Submissions that could not be scored in the last run, one per line
+FAILURES_FILE_NAME = "failures.jsonl"
+# Message Batch submitted by a --batch run that hasn't saved its results yet, resumed by the next one
+PENDING_BATCH_FILE_NAME = "pending_batch.json"
+
+# HTTP statuses worth retrying besides 5xx: request timeout, lock conflict and rate limit
+RETRYABLE_STATUS_CODES = (408, 409, 429)
+
+# WordprocessingML tags read when streaming text out of word/document.xml
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_P, W_T, W_TAB, W_BR, W_CR = W_NS + "p", W_NS + "t", W_NS + "tab", W_NS + "br", W_NS + "cr"
+# Text boxes are stored twice (mc:Choice and a legacy mc:Fallback copy); only the first is read
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+# Score lines of the required output format, one named group per field
+RESPONSE_SCORE_RE = re.compile(
+    r"^[ \t]*(?:"
+    r"\*\*Total Score(?P<total_score>[^\n]*)"
+    r"|- Prompt Clarity:(?P<prompt_clarity>[^\n]*)"
+    r"|- Real-World Relevance:(?P<real_world_relevance>[^\n]*)"
+    r"|- Reflection Quality:(?P<reflection_quality>[^\n]*)"
+    r"|- Responsible Use:(?P<responsible_use>[^\n]*)"
+    r"|- Writing Clarity:(?P<writing_clarity>[^\n]*)"
+    r")",
+    re.M
+)
+
+# Markers used to tell real submissions from empty templates, found in a single scan
+SUBMISSION_MARKERS_RE = re.compile(
+    r"section [123]|q1|generative ai|artificial intelligence|step [12]|prompt|write|criterion|evaluator comments",
+    re.I
+)
+
+# Multi-line feedback blocks run until the next bold header or the end of the response
+SUMMARY_FEEDBACK_RE = re.compile(
+    r"^[ \t]*\*\*Summary Feedback:?(?:\*\*)?:?(?P<body>.*?)(?=^[ \t]*\*\*|\Z)", re.M | re.S
+)
+IMPROVEMENT_SUGGESTION_RE = re.compile(
+    r"^[ \t]*\*\*Improvement Suggestion:?(?:\*\*)?:?(?P<body>.*?)(?=^[ \t]*\*\*|\Z)", re.M | re.S
+)
+
+
+def is_retryable_api_error(error: BaseException) -> bool:
+    """Whether an API error is transient: dropped connections, rate limits and overloaded/5xx responses.
+
+    Matches on status code because 503 and 529 have their own exception classes
+    that don't derive from InternalServerError.
+    """
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    if isinstance(error, anthropic.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+class SemanticCache:
+    """Reuses evaluations of near-duplicate submissions based on embedding similarity.
+
+    Each entry records the context (model and rubric) it was evaluated under, and lookups
+    only match entries from the same context.
+    """
+
+    # MiniLM truncates input at 256 word pieces, so text is embedded in chunks well under that
+    CHUNK_WORDS = 150
+
+    def __init__(self, path: str, threshold: float = 0.87, model_name: str = "all-MiniLM-L6-v2",
+                 template_lines: Optional[set] = None):
+        """Load previously stored entries from `path`, if present.
+
+        Lines in `template_lines` (the assignment's own questions and headings) are left out of
+        embeddings, so similarity reflects the students' answers rather than the shared template.
+        """
+        self.path = Path(path)
+        self.threshold = threshold
+        self.model_name = model_name
+        self.template_lines = template_lines or set()
+        self._model = None
+        self.embeddings = np.empty((0, 0), dtype=np.float32)
+        self.evaluations: List[Dict[str, Any]] = []
+        self.contexts: List[str] = []
+
+        if self.path.exists():
+            with np.load(self.path) as data:
+                # Files without contexts can't be matched to a model or rubric, so they are ignored
+                if "contexts" in data.files:
+                    self.embeddings = data["embeddings"]
+                    self.evaluations = [json.loads(e) for e in data["evaluations"]]
+                    self.contexts = [str(c) for c in data["contexts"]]
+
+    def load_model(self) -> None:
+        """Load the embedding model if it isn't loaded yet."""
+        if self._model is None:
+            # Imported lazily: it pulls in torch, which extraction worker processes never need
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name)
+
+    def encode(self, text: str) -> "np.ndarray":
+        """Embed the non-template text as a unit vector, loading the model on first use.
+
+        Safe to call from worker threads once `load_model` has run; `lookup` and `add` are not.
+        """
+        self.load_model()
+
+        answer_lines = [line for line in text.splitlines() if line.strip() not in self.template_lines]
+        words = "\n".join(answer_lines).split() or text.split()
+        chunks = [" ".join(words[i:i + self.CHUNK_WORDS]) for i in range(0, len(words), self.CHUNK_WORDS)] or [""]
+
+        # Mean-pool the chunk embeddings so the whole submission counts, then renormalize
+        embedding = self._model.encode(chunks, normalize_embeddings=True).mean(axis=0)
+        return (embedding / np.linalg.norm(embedding)).astype(np.float32)
+
+    def lookup(self, embedding: "np.ndarray", context: str) -> Tuple[Optional[Dict[str, Any]], float]:
+        """Return a copy of the most similar stored evaluation from `context` if it clears the threshold."""
+        in_context = np.array([c == context for c in self.contexts], dtype=bool)
+        if not in_context.any():
+            return None, 0.0
+
+        similarities = np.where(in_context, self.embeddings @ embedding, -np.inf)
+        best = int(similarities.argmax())
+        similarity = float(similarities[best])
+
+        if similarity < self.threshold:
+            return None, similarity
+        return copy.deepcopy(self.evaluations[best]), similarity
+
+    def add(self, embedding: "np.ndarray", evaluation: Dict[str, Any], context: str) -> None:
+        """Remember an evaluation made under `context` for future lookups."""
+        stored = {key: value for key, value in evaluation.items() if key not in ("metadata", "raw_response")}
+        self.evaluations.append(copy.deepcopy(stored))
+        self.contexts.append(context)
+        if self.embeddings.size:
+            self.embeddings = np.vstack([self.embeddings, embedding])
+        else:
+            self.embeddings = embedding[np.newaxis, :]
+
+    def save(self) -> None:
+        """Persist embeddings, evaluations and their contexts to the .npz file."""
+        np.savez(
+            self.path,
+            embeddings=self.embeddings,
+            evaluations=np.array([json.dumps(e, ensure_ascii=False) for e in self.evaluations]),
+            contexts=np.array(self.contexts)
+        )
+
+
+class RateLimiter:
+    """Token-bucket limiter shared by concurrent requests, enforcing per-minute request and token caps.
+
+    Either cap may be None to leave that dimension unlimited. Buckets start full and refill
+    continuously, so throughput stays near the cap without bursting into 429 responses.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        """Create full buckets for the given per-minute limits."""
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._available_requests = float(requests_per_minute or 0)
+        self._available_tokens = float(tokens_per_minute or 0)
+        self._last_refill = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        """Return a lock bound to the running event loop, creating a fresh one for each new loop."""
+        # Every asyncio.run() starts a new loop, and a lock bound to an earlier loop can't be awaited
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    def _refill(self) -> None:
+        """Add the capacity accrued since the last refill, up to one minute's worth."""
+        now = time.monotonic()
+        elapsed_minutes = (now - self._last_refill) / 60
+        self._last_refill = now
+
+        if self.requests_per_minute:
+            self._available_requests = min(float(self.requests_per_minute),
+                                           self._available_requests + elapsed_minutes * self.requests_per_minute)
+        if self.tokens_per_minute:
+            self._available_tokens = min(float(self.tokens_per_minute),
+                                         self._available_tokens + elapsed_minutes * self.tokens_per_minute)
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Wait until one request and `tokens` tokens are available, then consume them."""
+        # Waiters queue on the lock, so capacity is handed out in arrival order
+        async with self._get_lock():
+            if self.tokens_per_minute:
+                # A request larger than the whole bucket waits for a full bucket instead of forever
+                tokens = min(tokens, self.tokens_per_minute)
+
+            while True:
+                self._refill()
+                wait_minutes = 0.0
+                if self.requests_per_minute and self._available_requests < 1:
+                    wait_minutes = (1 - self._available_requests) / self.requests_per_minute
+                if self.tokens_per_minute and self._available_tokens < tokens:
+                    wait_minutes = max(wait_minutes,
+                                       (tokens - self._available_tokens) / self.tokens_per_minute)
+                if wait_minutes <= 0:
+                    break
+                await asyncio.sleep(wait_minutes * 60)
+
+            if self.requests_per_minute:
+                self._available_requests -= 1
+            if self.tokens_per_minute:
+                self._available_tokens -= tokens
 
 
 class AssignmentScorer:
@@ -20,7 +252,69 @@ class AssignmentScorer:
         """Initialize the scorer with configuration."""
         self.config = self._load_config(config_path)
         self.evaluation_prompt = self._load_evaluation_prompt()
+        self._prompt_prefix = self._build_prompt_prefix()
         self.client = anthropic.Anthropic(api_key=self.config.get("anthropic_api_key"))
+        # The async client is created per event loop by _get_async_client
+        self._aclient: Optional[anthropic.AsyncAnthropic] = None
+        self._aclient_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.limiter = RateLimiter(
+            self.config.get("max_requests_per_minute"),
+            self.config.get("max_tokens_per_minute")
+        )
+        self.cache = shelve.open(self.config.get("cache_path", ".llm_cache.db"))
+        self.semantic_cache = self._load_semantic_cache()
+
+    def _load_semantic_cache(self) -> Optional[SemanticCache]:
+        """Create the semantic cache if enabled in config and its dependencies are installed."""
+        if not self.config.get("semantic_cache", False):
+            return None
+
+        if importlib.util.find_spec("sentence_transformers") is None:
+            print("Warning: semantic_cache is enabled but sentence-transformers is not installed. "
+                  "Install it with: pip install sentence-transformers")
+            return None
+
+        return SemanticCache(
+            self.config.get("semantic_cache_path", ".semantic_cache.npz"),
+            threshold=self.config.get("semantic_cache_threshold", 0.87),
+            template_lines=self._load_template_lines()
+        )
+
+    def _load_template_lines(self) -> set:
+        """Collect the lines of the blank assignment templates, which every submission repeats."""
+        template_dir = Path(self.config.get("assignment_template_dir", "assignment-template"))
+        template_lines = set()
+        for template_file in sorted(template_dir.glob("*.docx")):
+            try:
+                text = self.extract_text_from_docx(str(template_file))
+            except Exception as e:
+                print(f"Warning: Could not read template {template_file}: {e}")
+                continue
+            template_lines.update(line.strip() for line in text.splitlines() if line.strip())
+        return template_lines
+
+    def _get_async_client(self) -> anthropic.AsyncAnthropic:
+        """Return an async client for the running event loop, creating one per loop."""
+        # Its connection pool belongs to the loop that opened it, so clients aren't shared across asyncio.run() calls
+        loop = asyncio.get_running_loop()
+        if self._aclient is None or self._aclient_loop is not loop:
+            # Retries are handled by tenacity in _create_message_async
+            self._aclient = anthropic.AsyncAnthropic(api_key=self.config.get("anthropic_api_key"), max_retries=0)
+            self._aclient_loop = loop
+        return self._aclient
+
+    async def _close_async_client(self) -> None:
+        """Close the async client's connections before its event loop shuts down."""
+        if self._aclient is not None:
+            await self._aclient.close()
+            self._aclient = None
+            self._aclient_loop = None
+
+    def close(self) -> None:
+        """Flush and close the response caches."""
+        self.cache.close()
+        if self.semantic_cache is not None:
+            self.semantic_cache.save()
 
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         """Load configuration from JSON file."""
@@ -40,8 +334,8 @@ class AssignmentScorer:
         with open("evaluation_prompt.json", 'r', encoding='utf-8') as f:
             return json.load(f)
 
-    def _build_evaluation_prompt(self, student_text: str) -> str:
-        """Build the complete evaluation prompt with student submission."""
+    def _build_prompt_prefix(self) -> str:
+        """Build the static part of the evaluation prompt that precedes every submission."""
         prompt_parts = [
             self.evaluation_prompt["system_role"],
             "",
@@ -78,9 +372,10 @@ class AssignmentScorer:
         ])
 
         # Add evaluation criteria
-        for criterion_name, criterion_data in self.evaluation_prompt["evaluation_criteria"].items():
+        criteria = self.evaluation_prompt["evaluation_criteria"].items()
+        for number, (criterion_name, criterion_data) in enumerate(criteria, 1):
             title = criterion_name.replace("_", " ").title()
-            prompt_parts.append(f"{len(prompt_parts) - 15}) {title.upper()} (0–{criterion_data['max_points']})")
+            prompt_parts.append(f"{number}) {title.upper()} (0–{criterion_data['max_points']})")
             prompt_parts.append("Focus on:")
             for focus_item in criterion_data["focus"]:
                 prompt_parts.append(f"- {focus_item}")
@@ -148,44 +443,96 @@ class AssignmentScorer:
             "STUDENT SUBMISSION TO EVALUATE:",
             "================================",
             "",
-            student_text
+            ""
         ])
 
         return "\n".join(prompt_parts)
 
-    def extract_text_from_docx(self, docx_path: str) -> str:
-        """Extract text content from a Word document."""
-        doc = Document(docx_path)
-        text_parts = []
+    def _build_evaluation_prompt(self, student_text: str) -> str:
+        """Build the complete evaluation prompt with student submission."""
+        return self._prompt_prefix + student_text
+
+    def _build_messages(self, student_text: str) -> List[Dict[str, Any]]:
+        """Build the API messages, marking the static prompt prefix for server-side prompt caching."""
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": self._prompt_prefix,
+                        "cache_control": {"type": "ephemeral"}
+                    },
+                    {
+                        "type": "text",
+                        "text": student_text
+                    }
+                ]
+            }
+        ]
 
-        for para in doc.paragraphs:
-            if para.text.strip():
-                text_parts.append(para.text)
+    @staticmethod
+    def extract_text_from_docx(docx_path: str) -> str:
+        """Extract paragraph and table text from a Word document, in document order."""
+        with zipfile.ZipFile(docx_path) as archive:
+            document_xml = archive.read("word/document.xml")
 
-        # Also extract text from tables
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    if cell.text.strip():
-                        text_parts.append(cell.text)
+        text_parts = []
+        runs = []
+        fallback_depth = 0
+
+        for event, element in ET.iterparse(io.BytesIO(document_xml), events=("start", "end")):
+            tag = element.tag
+
+            if tag == MC_FALLBACK:
+                fallback_depth += 1 if event == "start" else -1
+            elif event == "start" or fallback_depth:
+                continue
+            elif tag == W_T:
+                runs.append(element.text or "")
+            elif tag == W_TAB:
+                runs.append("\t")
+            elif tag == W_BR or tag == W_CR:
+                runs.append("\n")
+            elif tag == W_P:
+                # Paragraphs cover both body text and table cells
+                paragraph = "".join(runs)
+                if paragraph.strip():
+                    text_parts.append(paragraph)
+                runs.clear()
+                element.clear()
 
         return "\n".join(text_parts)
 
+    @staticmethod
+    def _extract_text_or_error(docx_path: str) -> Union[str, Exception]:
+        """Extract text, returning the exception instead of raising so one bad file doesn't stop a pool."""
+        try:
+            return AssignmentScorer.extract_text_from_docx(docx_path)
+        except Exception as e:
+            return e
+
+    def _extract_all_texts(self, docx_files: List[Path]) -> List[Union[str, Exception]]:
+        """Extract text from every document in parallel worker processes."""
+        with concurrent.futures.ProcessPoolExecutor() as pool:
+            return list(pool.map(AssignmentScorer._extract_text_or_error,
+                                 [str(f) for f in docx_files], chunksize=4))
+
     def check_if_submission_is_complete(self, student_text: str) -> tuple[bool, str]:
         """Check if the submission contains actual student work or is just a template."""
-        text_lower = student_text.lower()
+        markers = {marker.lower() for marker in SUBMISSION_MARKERS_RE.findall(student_text)}
 
         # Check for required sections
-        has_section_1 = "section 1" in text_lower
-        has_section_2 = "section 2" in text_lower
-        has_section_3 = "section 3" in text_lower
+        has_section_1 = "section 1" in markers
+        has_section_2 = "section 2" in markers
+        has_section_3 = "section 3" in markers
 
         # Check for key content markers that indicate ACTUAL student answers
-        has_q1_answer = ("q1" in text_lower or "q1." in text_lower) and ("generative ai" in text_lower or "artificial intelligence" in text_lower)
-        has_step_content = ("step 1" in text_lower and "step 2" in text_lower and ("prompt" in text_lower or "write" in text_lower))
+        has_q1_answer = "q1" in markers and ("generative ai" in markers or "artificial intelligence" in markers)
+        has_step_content = ("step 1" in markers and "step 2" in markers and ("prompt" in markers or "write" in markers))
 
         # Red flags for templates - evaluation table without actual answers
-        has_eval_table = ("criterion" in text_lower and "evaluator comments" in text_lower)
+        has_eval_table = ("criterion" in markers and "evaluator comments" in markers)
 
         # Count how many section headers vs actual content we have
         section_count = sum([has_section_1, has_section_2, has_section_3])
@@ -202,14 +549,27 @@ class AssignmentScorer:
         # If we have section headers but no actual answers to questions
         if (has_section_1 or has_section_2 or has_section_3) and not (has_q1_answer or has_step_content):
             # Check if it's ONLY headers and evaluation tables
-            lines = [line.strip() for line in student_text.split('\n') if line.strip()]
-            substantive_lines = [line for line in lines if len(line) > 50 and not line.startswith('Section') and 'criterion' not in line.lower()]
-
-            if len(substantive_lines) < 5:  # Less than 5 substantive lines suggests it's mostly empty
+            substantive_lines = 0
+            for line in student_text.splitlines():
+                line = line.strip()
+                if len(line) > 50 and not line.startswith('Section') and 'criterion' not in line.lower():
+                    substantive_lines += 1
+                    if substantive_lines >= 5:
+                        break
+
+            if substantive_lines < 5:  # Less than 5 substantive lines suggests it's mostly empty
                 return False, "Submission contains section headers but lacks actual student responses."
 
         return True, "Submission appears complete"
 
+    def _extract_feedback_block(self, pattern: "re.Pattern[str]", response_text: str) -> str:
+        """Return a feedback section's lines joined into a single paragraph."""
+        match = pattern.search(response_text)
+        if not match:
+            return ""
+        lines = (line.strip() for line in match.group("body").splitlines())
+        return " ".join(line for line in lines if line)
+
     def parse_evaluation_response(self, response_text: str) -> Dict[str, Any]:
         """Parse the AI's evaluation response into structured JSON."""
         result = {
@@ -226,46 +586,18 @@ class AssignmentScorer:
             "raw_response": response_text
         }
 
-        lines = response_text.split('\n')
-        current_section = None
-
-        for line in lines:
-            line = line.strip()
+        for match in RESPONSE_SCORE_RE.finditer(response_text):
+            field = match.lastgroup
+            value = match.group(field)
 
-            if line.startswith("**Total Score"):
+            if field == "total_score":
                 # Handle both "**Total Score:** X / 25" and "**Total Score: X / 25**"
-                score_text = line.replace("**Total Score:**", "").replace("**Total Score:", "").replace("**", "").strip()
-                result["total_score"] = score_text
-
-            elif line.startswith("- Prompt Clarity:"):
-                result["category_breakdown"]["prompt_clarity"] = line.split(":")[-1].strip()
-
-            elif line.startswith("- Real-World Relevance:"):
-                result["category_breakdown"]["real_world_relevance"] = line.split(":")[-1].strip()
-
-            elif line.startswith("- Reflection Quality:"):
-                result["category_breakdown"]["reflection_quality"] = line.split(":")[-1].strip()
+                result["total_score"] = value.replace("**", "").lstrip(":").strip()
+            else:
+                result["category_breakdown"][field] = value.strip()
 
-            elif line.startswith("- Responsible Use:"):
-                result["category_breakdown"]["responsible_use"] = line.split(":")[-1].strip()
-
-            elif line.startswith("- Writing Clarity:"):
-                result["category_breakdown"]["writing_clarity"] = line.split(":")[-1].strip()
-
-            elif line.startswith("**Summary Feedback"):
-                current_section = "summary"
-
-            elif line.startswith("**Improvement Suggestion"):
-                current_section = "improvement"
-
-            elif current_section == "summary" and line and not line.startswith("**"):
-                result["summary_feedback"] += line + " "
-
-            elif current_section == "improvement" and line and not line.startswith("**"):
-                result["improvement_suggestion"] += line + " "
-
-        result["summary_feedback"] = result["summary_feedback"].strip()
-        result["improvement_suggestion"] = result["improvement_suggestion"].strip()
+        result["summary_feedback"] = self._extract_feedback_block(SUMMARY_FEEDBACK_RE, response_text)
+        result["improvement_suggestion"] = self._extract_feedback_block(IMPROVEMENT_SUGGESTION_RE, response_text)
 
         # Validate and fix total score if missing
         if not result["total_score"]:
@@ -286,26 +618,131 @@ class AssignmentScorer:
 
         return result
 
+    def _cache_key(self, prompt: str) -> str:
+        """Build the response cache key for a prompt under the current model settings."""
+        model = self.config.get("model", "claude-3-5-sonnet-20241022")
+        max_tokens = self.config.get("max_tokens", 4096)
+        return hashlib.sha256(f"{model}|{max_tokens}|{prompt}".encode("utf-8")).hexdigest()
+
+    def _get_cached_response(self, cache_key: str) -> Optional[str]:
+        """Return the stored response text for a cache key, if any."""
+        response_text = self.cache.get(cache_key)
+        if response_text is not None:
+            print("  ✓ Identical prompt found in cache, skipping API call")
+        return response_text
+
+    def _store_cached_response(self, cache_key: str, response_text: str) -> None:
+        """Persist a response so identical prompts are not sent again."""
+        self.cache[cache_key] = response_text
+        self.cache.sync()
+
     def evaluate_assignment(self, student_text: str) -> Dict[str, Any]:
         """Send student assignment to AI for evaluation."""
         prompt = self._build_evaluation_prompt(student_text)
+        cache_key = self._cache_key(prompt)
+
+        cached_response = self._get_cached_response(cache_key)
+        if cached_response is not None:
+            return self.parse_evaluation_response(cached_response)
 
         message = self.client.messages.create(
             model=self.config.get("model", "claude-3-5-sonnet-20241022"),
             max_tokens=self.config.get("max_tokens", 4096),
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
+            messages=self._build_messages(student_text)
         )
 
         response_text = message.content[0].text
+        self._store_cached_response(cache_key, response_text)
+        return self.parse_evaluation_response(response_text)
+
+    async def _evaluate_assignment_async(self, student_text: str) -> Dict[str, Any]:
+        """Send student assignment to AI for evaluation without blocking the event loop."""
+        prompt = self._build_evaluation_prompt(student_text)
+        cache_key = self._cache_key(prompt)
+
+        cached_response = self._get_cached_response(cache_key)
+        if cached_response is not None:
+            return self.parse_evaluation_response(cached_response)
+
+        message = await self._create_message_async(student_text)
+
+        response_text = message.content[0].text
+        self._store_cached_response(cache_key, response_text)
         return self.parse_evaluation_response(response_text)
 
-    def score_assignment(self, student_file_path: str) -> Dict[str, Any]:
-        """Score a single student assignment."""
+    @retry(
+        retry=retry_if_exception(is_retryable_api_error),
+        wait=wait_random_exponential(multiplier=1, max=60),
+        stop=stop_after_attempt(5),
+        reraise=True
+    )
+    async def _create_message_async(self, student_text: str) -> anthropic.types.Message:
+        """Call the Messages API, retrying transient failures with jittered exponential backoff."""
+        max_tokens = self.config.get("max_tokens", 4096)
+
+        # Rough estimate: ~4 characters per input token, plus the full output allowance
+        estimated_tokens = (len(self._prompt_prefix) + len(student_text)) // 4 + max_tokens
+        await self.limiter.acquire(estimated_tokens)
+
+        return await self._get_async_client().messages.create(
+            model=self.config.get("model", "claude-3-5-sonnet-20241022"),
+            max_tokens=max_tokens,
+            messages=self._build_messages(student_text)
+        )
+
+    def _find_similar_evaluation(self, student_text: str) -> Tuple[Optional[Dict[str, Any]], Optional["np.ndarray"]]:
+        """Look up a near-duplicate submission in the semantic cache.
+
+        Returns the reusable evaluation (or None) and the submission's embedding,
+        which should be passed to `_remember_evaluation` after a fresh evaluation.
+        """
+        if self.semantic_cache is None:
+            return None, None
+
+        embedding = self.semantic_cache.encode(student_text)
+        return self._lookup_similar_evaluation(embedding), embedding
+
+    def _lookup_similar_evaluation(self, embedding: "np.ndarray") -> Optional[Dict[str, Any]]:
+        """Return the reusable evaluation of a near-duplicate of an already embedded submission."""
+        evaluation, similarity = self.semantic_cache.lookup(embedding, self._semantic_context())
+        if evaluation is not None:
+            print(f"  ✓ Near-duplicate submission found (similarity {similarity:.2f}), reusing its evaluation")
+        return evaluation
+
+    def _remember_evaluation(self, embedding: Optional["np.ndarray"], evaluation: Dict[str, Any]) -> None:
+        """Add a fresh evaluation to the semantic cache."""
+        if self.semantic_cache is not None and embedding is not None:
+            self.semantic_cache.add(embedding, evaluation, self._semantic_context())
+
+    def _semantic_context(self) -> str:
+        """Key the model, max_tokens and rubric, so evaluations are only reused under the same ones."""
+        return self._cache_key(self._prompt_prefix)
+
+    def _incomplete_evaluation(self, reason: str) -> Dict[str, Any]:
+        """Build the low-score evaluation returned for incomplete submissions."""
+        return {
+            "total_score": "1 / 25",
+            "category_breakdown": {
+                "prompt_clarity": "0/5",
+                "real_world_relevance": "0/5",
+                "reflection_quality": "0/5",
+                "responsible_use": "0/5",
+                "writing_clarity": "1/5"
+            },
+            "summary_feedback": f"This submission appears to be incomplete. {reason} To receive a proper evaluation, please submit a complete assignment that includes all three sections with your own work: Section 1 (Understanding Generative AI), Section 2 (Writing and Testing Prompts with Steps 1-5), and Section 3 (Responsible and Safe Use).",
+            "improvement_suggestion": "Please review the assignment requirements and ensure you complete all sections with thoughtful, original responses. Focus on providing real examples from your work and detailed reflections on your learning.",
+            "raw_response": f"Incomplete submission: {reason}"
+        }
+
+    def _add_metadata(self, evaluation: Dict[str, Any], student_file: str, evaluation_date: Optional[str] = None) -> None:
+        """Attach the student's file name and the evaluation timestamp (now, unless given)."""
+        evaluation["metadata"] = {
+            "student_file": student_file,
+            "evaluation_date": evaluation_date or datetime.now().isoformat()
+        }
+
+    def score_assignment(self, student_file_path: str, run_ts: Optional[str] = None) -> Dict[str, Any]:
+        """Score a single student assignment, dated `run_ts` if given."""
         print(f"Processing: {student_file_path}")
 
         # Extract text from document
@@ -317,40 +754,146 @@ class AssignmentScorer:
         if not is_complete:
             # Return a very low score for incomplete submissions
             print(f"  ⚠️  Incomplete submission detected: {reason}")
-            evaluation = {
-                "total_score": "1 / 25",
-                "category_breakdown": {
-                    "prompt_clarity": "0/5",
-                    "real_world_relevance": "0/5",
-                    "reflection_quality": "0/5",
-                    "responsible_use": "0/5",
-                    "writing_clarity": "1/5"
-                },
-                "summary_feedback": f"This submission appears to be incomplete. {reason} To receive a proper evaluation, please submit a complete assignment that includes all three sections with your own work: Section 1 (Understanding Generative AI), Section 2 (Writing and Testing Prompts with Steps 1-5), and Section 3 (Responsible and Safe Use).",
-                "improvement_suggestion": "Please review the assignment requirements and ensure you complete all sections with thoughtful, original responses. Focus on providing real examples from your work and detailed reflections on your learning.",
-                "raw_response": f"Incomplete submission: {reason}"
-            }
+            evaluation = self._incomplete_evaluation(reason)
         else:
-            # Get evaluation from AI
-            evaluation = self.evaluate_assignment(student_text)
+            # Reuse the evaluation of a near-duplicate submission, or get one from AI
+            evaluation, embedding = self._find_similar_evaluation(student_text)
+            if evaluation is None:
+                evaluation = self.evaluate_assignment(student_text)
+                self._remember_evaluation(embedding, evaluation)
 
         # Add metadata
-        evaluation["metadata"] = {
-            "student_file": os.path.basename(student_file_path),
-            "evaluation_date": datetime.now().isoformat()
-        }
+        self._add_metadata(evaluation, Path(student_file_path).name, run_ts)
 
         return evaluation
 
+    async def _evaluate_text_async(self, docx_file: Path, student_text: str) -> Tuple[Dict[str, Any], bool]:
+        """Evaluate an already-extracted submission without blocking the event loop (no metadata).
+
+        Also returns whether the evaluation was reused from a near-duplicate submission.
+        """
+        print(f"Processing: {docx_file}")
+
+        # Check if submission is complete
+        is_complete, reason = self.check_if_submission_is_complete(student_text)
+
+        if not is_complete:
+            print(f"  ⚠️  Incomplete submission detected: {reason}")
+            evaluation = self._incomplete_evaluation(reason)
+        else:
+            evaluation, embedding = None, None
+            if self.semantic_cache is not None:
+                # Only embedding runs in a worker thread; the cache is read and updated on the loop thread
+                embedding = await asyncio.to_thread(self.semantic_cache.encode, student_text)
+                evaluation = self._lookup_similar_evaluation(embedding)
+                if evaluation is not None:
+                    return evaluation, True
+
+            evaluation = await self._evaluate_assignment_async(student_text)
+            self._remember_evaluation(embedding, evaluation)
+
+        return evaluation, False
+
+    def _find_assignment_files(self, input_dir: str) -> List[Path]:
+        """List the .docx submissions in input_dir, skipping hidden files and Word's ~$ lock files."""
+        if not os.path.isdir(input_dir):
+            return []
+
+        with os.scandir(input_dir) as entries:
+            return sorted(
+                Path(entry.path) for entry in entries
+                if entry.name.endswith(".docx")
+                and not entry.name.startswith(("~$", "."))
+                and entry.is_file()
+            )
+
     def score_all_assignments(self, input_dir: str = "student-assignments",
                             output_dir: str = "evaluation-results") -> List[Dict[str, Any]]:
         """Score all assignments in the input directory."""
+        async def run() -> List[Dict[str, Any]]:
+            try:
+                return await self.score_all_assignments_async(input_dir, output_dir)
+            finally:
+                await self._close_async_client()
+
+        return asyncio.run(run())
+
+    async def score_all_assignments_async(self, input_dir: str = "student-assignments",
+                                          output_dir: str = "evaluation-results") -> List[Dict[str, Any]]:
+        """Score all assignments concurrently, capped at `max_concurrency` in-flight requests."""
+        # Create output directory if it doesn't exist
+        Path(output_dir).mkdir(exist_ok=True)
+
+        docx_files = self._find_assignment_files(input_dir)
+
+        if not docx_files:
+            print(f"No .docx files found in {input_dir}")
+            return []
+
+        print(f"Found {len(docx_files)} assignment(s) to evaluate.")
+
+        # One timestamp for the whole run, so its results can be grouped later
+        run_ts = datetime.now().isoformat()
+
+        # Text extraction is CPU-bound, so parse every document across all cores before any API calls,
+        # waiting on the pool from a thread so the event loop stays free for other tasks
+        student_texts = await asyncio.to_thread(self._extract_all_texts, docx_files)
+
+        # Identical submissions are evaluated once and the result is copied to each file
+        groups, failures = self._group_by_submission(docx_files, student_texts)
+
+        if self.semantic_cache is not None:
+            # Load the model once up front rather than racing to load it from several worker threads
+            await asyncio.to_thread(self.semantic_cache.load_model)
+
+        semaphore = asyncio.Semaphore(self.config.get("max_concurrency", 8))
+
+        async def score_and_save(submission_key: str, student_text: str, files: List[Path]) -> List[Dict[str, Any]]:
+            evaluation = self._load_by_hash(output_dir, submission_key)
+
+            if evaluation is not None:
+                print(f"  ✓ {files[0].name} matches an already evaluated submission, reusing its result")
+            else:
+                async with semaphore:
+                    evaluation, is_near_duplicate = await self._evaluate_text_async(files[0], student_text)
+                # by_hash only holds evaluations of this exact text, never a near-duplicate's
+                if not is_near_duplicate:
+                    self._store_by_hash(evaluation, output_dir, submission_key)
+
+            # Save individual results and their summary lines as soon as they are ready
+            return self._save_for_files(evaluation, files, output_dir, summary_file, run_ts)
+
+        with self._open_summary(output_dir) as summary_file:
+            outcomes = await asyncio.gather(
+                *(score_and_save(key, text, files) for key, (text, files) in groups.items()),
+                return_exceptions=True
+            )
+
+        results = []
+        for (_, files), outcome in zip(groups.values(), outcomes):
+            if isinstance(outcome, Exception):
+                for docx_file in files:
+                    print(f"✗ Error processing {docx_file}: {str(outcome)}")
+                    print()
+                    failures.append((docx_file, str(outcome)))
+            else:
+                results.extend(outcome)
+
+        self._save_failures(failures, output_dir)
+
+        if self.semantic_cache is not None:
+            self.semantic_cache.save()
+
+        self._report_saved(output_dir)
+        return results
+
+    def score_all_assignments_batched(self, input_dir: str = "student-assignments",
+                                      output_dir: str = "evaluation-results") -> List[Dict[str, Any]]:
+        """Score all assignments through the Message Batches API (half price, results within 24h)."""
         # Create output directory if it doesn't exist
         Path(output_dir).mkdir(exist_ok=True)
 
-        # Find all .docx files
-        input_path = Path(input_dir)
-        docx_files = list(input_path.glob("*.docx"))
+        docx_files = self._find_assignment_files(input_dir)
 
         if not docx_files:
             print(f"No .docx files found in {input_dir}")
@@ -358,49 +901,293 @@ class AssignmentScorer:
 
         print(f"Found {len(docx_files)} assignment(s) to evaluate.")
 
+        # One timestamp for the whole run, so its results can be grouped later
+        run_ts = datetime.now().isoformat()
+
         results = []
+        # Batch custom_ids only allow [A-Za-z0-9_-], so submissions are mapped separately
+        pending_keys = {}
+        # Embeddings of every submission awaiting a batch result, by submission key
+        pending_embeddings = {}
 
-        for docx_file in docx_files:
-            try:
-                # Score the assignment
-                evaluation = self.score_assignment(str(docx_file))
-                results.append(evaluation)
+        student_texts = self._extract_all_texts(docx_files)
 
-                # Save individual result
-                student_name = docx_file.stem
-                output_file = Path(output_dir) / f"{student_name}_evaluation.json"
+        # Identical submissions are sent once and the result is copied to each file
+        groups, failures = self._group_by_submission(docx_files, student_texts)
 
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(evaluation, f, indent=2, ensure_ascii=False)
+        # A batch left by an interrupted run is already paid for, so wait on it instead of resubmitting
+        resumed_batch = self._load_pending_batch(output_dir)
+        if resumed_batch:
+            try:
+                self.client.messages.batches.retrieve(resumed_batch[0])
+            except anthropic.NotFoundError:
+                print(f"Warning: Batch {resumed_batch[0]} from an earlier run no longer exists; resubmitting its assignments")
+                self._clear_pending_batch(output_dir)
+                resumed_batch = None
+        resumed_keys = set(resumed_batch[1].values()) if resumed_batch else set()
+
+        def wait_and_save(batch_id: str, request_keys: Dict[str, str]) -> None:
+            poll_interval = self.config.get("batch_poll_interval", 60)
+            batch = self.client.messages.batches.retrieve(batch_id)
+            while batch.processing_status != "ended":
+                time.sleep(poll_interval)
+                batch = self.client.messages.batches.retrieve(batch_id)
+                counts = batch.request_counts
+                print(f"  Batch status: {batch.processing_status} "
+                      f"({counts.succeeded} succeeded, {counts.errored} errored, {counts.processing} processing)")
+            print()
+
+            for entry in self.client.messages.batches.results(batch_id):
+                submission_key = request_keys[entry.custom_id]
+                # A resumed batch may cover submissions that were since removed or scored another way
+                awaited = submission_key in pending_embeddings
+                files = groups[submission_key][1] if awaited else []
+
+                if entry.result.type != "succeeded":
+                    for docx_file in files:
+                        print(f"✗ Error processing {docx_file}: batch request {entry.result.type}")
+                        print()
+                        failures.append((docx_file, f"batch request {entry.result.type}"))
+                    continue
+
+                response_text = entry.result.message.content[0].text
+                self._store_cached_response(submission_key, response_text)
+
+                evaluation = self.parse_evaluation_response(response_text)
+                self._store_by_hash(evaluation, output_dir, submission_key)
+                if awaited:
+                    self._remember_evaluation(pending_embeddings[submission_key], evaluation)
+                    results.extend(self._save_for_files(evaluation, files, output_dir, summary_file, run_ts))
+
+            self._clear_pending_batch(output_dir)
+
+        with self._open_summary(output_dir) as summary_file:
+            for index, (submission_key, (student_text, files)) in enumerate(groups.items()):
+                evaluation = self._load_by_hash(output_dir, submission_key)
+
+                if evaluation is not None:
+                    print(f"  ✓ {files[0].name} matches an already evaluated submission, reusing its result")
+                    results.extend(self._save_for_files(evaluation, files, output_dir, summary_file, run_ts))
+                    continue
+
+                is_complete, reason = self.check_if_submission_is_complete(student_text)
+
+                if not is_complete:
+                    # Incomplete submissions are scored locally and never sent
+                    print(f"  ⚠️  Incomplete submission detected in {files[0].name}: {reason}")
+                    evaluation = self._incomplete_evaluation(reason)
+                else:
+                    evaluation, embedding = self._find_similar_evaluation(student_text)
+
+                    if evaluation is not None:
+                        # by_hash only holds evaluations of this exact text, never a near-duplicate's
+                        results.extend(self._save_for_files(evaluation, files, output_dir, summary_file, run_ts))
+                        continue
+
+                    # The submission key is also the response cache key for this prompt
+                    cached_response = self._get_cached_response(submission_key)
+                    if cached_response is not None:
+                        evaluation = self.parse_evaluation_response(cached_response)
+                        self._remember_evaluation(embedding, evaluation)
+
+                    if evaluation is None:
+                        pending_embeddings[submission_key] = embedding
+                        if submission_key not in resumed_keys:
+                            pending_keys[f"assignment-{index}"] = submission_key
+                        continue
+
+                self._store_by_hash(evaluation, output_dir, submission_key)
+                results.extend(self._save_for_files(evaluation, files, output_dir, summary_file, run_ts))
+
+            if resumed_batch:
+                batch_id, request_keys = resumed_batch
+                print(f"Resuming batch {batch_id} from an interrupted run. Waiting for results...")
+                wait_and_save(batch_id, request_keys)
+
+            if pending_keys:
+                batch = self.client.messages.batches.create(
+                    requests=[
+                        {
+                            "custom_id": custom_id,
+                            "params": {
+                                "model": self.config.get("model", "claude-3-5-sonnet-20241022"),
+                                "max_tokens": self.config.get("max_tokens", 4096),
+                                "messages": self._build_messages(groups[submission_key][0])
+                            }
+                        }
+                        for custom_id, submission_key in pending_keys.items()
+                    ]
+                )
+                # Saved before polling, so a run stopped while waiting can pick the batch up again
+                self._save_pending_batch(output_dir, batch.id, pending_keys)
+                print(f"Submitted batch {batch.id} with {len(pending_keys)} assignment(s). Waiting for results...")
+                wait_and_save(batch.id, pending_keys)
+
+        self._save_failures(failures, output_dir)
+
+        if self.semantic_cache is not None:
+            self.semantic_cache.save()
+
+        self._report_saved(output_dir)
+        return results
 
-                print(f"✓ Saved evaluation to: {output_file}")
-                print(f"  Score: {evaluation['total_score']}")
+    def _open_summary(self, output_dir: str) -> BinaryIO:
+        """Open the JSONL summary that evaluations are streamed to as they complete."""
+        return open(Path(output_dir) / SUMMARY_FILE_NAME, 'wb')
+
+    def _submission_key(self, student_text: str) -> str:
+        """Key a submission by its full prompt and model settings, so resubmissions under a new
+        file name still match but a changed model, max_tokens or rubric does not."""
+        return self._cache_key(self._build_evaluation_prompt(student_text))
+
+    def _group_by_submission(self, docx_files: List[Path], student_texts: List[Union[str, Exception]]
+                             ) -> Tuple[Dict[str, Tuple[str, List[Path]]], List[Tuple[Path, str]]]:
+        """Group files with identical submissions under their submission key.
+
+        Returns `{key: (student_text, files)}` and the (file, error) pairs for documents
+        whose text could not be extracted.
+        """
+        groups: Dict[str, Tuple[str, List[Path]]] = {}
+        failures = []
+        for docx_file, student_text in zip(docx_files, student_texts):
+            if isinstance(student_text, Exception):
+                print(f"✗ Error processing {docx_file}: {str(student_text)}")
                 print()
+                failures.append((docx_file, str(student_text)))
+                continue
+            groups.setdefault(self._submission_key(student_text), (student_text, []))[1].append(docx_file)
+        return groups, failures
+
+    def _load_by_hash(self, output_dir: str, submission_key: str) -> Optional[Dict[str, Any]]:
+        """Return the stored evaluation for an identical submission, if one exists."""
+        hash_file = Path(output_dir) / BY_HASH_DIR_NAME / f"{submission_key}.json"
+        if not hash_file.exists():
+            return None
+        try:
+            return orjson.loads(hash_file.read_bytes())
+        except orjson.JSONDecodeError as e:
+            # Unreadable entries are treated as missing and overwritten once the submission is rescored
+            print(f"Warning: Ignoring unreadable {hash_file}: {e}")
+            return None
+
+    def _store_by_hash(self, evaluation: Dict[str, Any], output_dir: str, submission_key: str) -> None:
+        """Store an evaluation under by_hash/ so identical submissions can reuse it."""
+        # Stored without metadata (each reuse gets its own student file and date) but with the raw response
+        hash_dir = Path(output_dir) / BY_HASH_DIR_NAME
+        hash_dir.mkdir(exist_ok=True)
+        canonical = {key: value for key, value in evaluation.items() if key != "metadata"}
+        self._write_atomic(hash_dir / f"{submission_key}.json", orjson.dumps(canonical, option=orjson.OPT_INDENT_2))
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        """Write a file via a temporary sibling, so an interrupted run never leaves it truncated."""
+        temp_path = path.with_name(path.name + ".tmp")
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+
+    def _save_for_files(self, evaluation: Dict[str, Any], files: List[Path], output_dir: str,
+                        summary_file: BinaryIO, run_ts: str) -> List[Dict[str, Any]]:
+        """Save a copy of one evaluation for each file that submitted it, returning the copies."""
+        saved = []
+        for docx_file in files:
+            file_evaluation = copy.deepcopy(evaluation)
+            self._add_metadata(file_evaluation, docx_file.name, run_ts)
+            self._save_evaluation(file_evaluation, output_dir, docx_file.stem, summary_file)
+            saved.append(file_evaluation)
+        return saved
+
+    def _save_evaluation(self, evaluation: Dict[str, Any], output_dir: str, student_name: str,
+                         summary_file: BinaryIO) -> None:
+        """Write a single student's evaluation to its JSON file and append it to the run summary.
+
+        The raw AI response is moved out of `evaluation` into raw/<student>.txt.gz (removing
+        any stale copy when there is none).
+        """
+        raw_response = evaluation.pop("raw_response", None)
+        raw_file = Path(output_dir) / RAW_DIR_NAME / f"{student_name}.txt.gz"
+        if raw_response is not None:
+            raw_file.parent.mkdir(exist_ok=True)
+            with gzip.open(raw_file, 'wt', encoding='utf-8') as f:
+                f.write(raw_response)
+        else:
+            # A reused evaluation has no raw response; drop one left by an earlier run so it can't be mistaken for this one
+            raw_file.unlink(missing_ok=True)
 
-            except Exception as e:
-                print(f"✗ Error processing {docx_file}: {str(e)}")
-                print()
+        output_file = Path(output_dir) / f"{student_name}_evaluation.json"
+        output_file.write_bytes(orjson.dumps(evaluation, option=orjson.OPT_INDENT_2))
 
-        # Save summary of all results
-        summary_file = Path(output_dir) / "all_evaluations_summary.json"
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        summary_file.write(orjson.dumps(evaluation, option=orjson.OPT_APPEND_NEWLINE))
+        summary_file.flush()
 
-        print(f"✓ All evaluations saved to: {output_dir}")
-        print(f"✓ Summary saved to: {summary_file}")
+        print(f"✓ Saved evaluation to: {output_file}")
+        print(f"  Score: {evaluation['total_score']}")
+        print()
 
-        return results
+    def _load_pending_batch(self, output_dir: str) -> Optional[Tuple[str, Dict[str, str]]]:
+        """Return the id and custom_id -> submission key map of a batch an earlier run left waiting."""
+        pending_file = Path(output_dir) / PENDING_BATCH_FILE_NAME
+        if not pending_file.exists():
+            return None
+        try:
+            pending = orjson.loads(pending_file.read_bytes())
+            return pending["batch_id"], pending["requests"]
+        except (orjson.JSONDecodeError, KeyError) as e:
+            print(f"Warning: Ignoring unreadable {pending_file}: {e}")
+            return None
+
+    def _save_pending_batch(self, output_dir: str, batch_id: str, request_keys: Dict[str, str]) -> None:
+        """Record a submitted batch until its results are saved."""
+        pending = {"batch_id": batch_id, "requests": request_keys}
+        self._write_atomic(Path(output_dir) / PENDING_BATCH_FILE_NAME, orjson.dumps(pending, option=orjson.OPT_INDENT_2))
+
+    def _clear_pending_batch(self, output_dir: str) -> None:
+        """Forget the pending batch once its results are saved."""
+        (Path(output_dir) / PENDING_BATCH_FILE_NAME).unlink(missing_ok=True)
+
+    def _save_failures(self, failures: List[Tuple[Path, str]], output_dir: str) -> None:
+        """Record submissions that could not be scored, replacing any list from a previous run.
+
+        Re-running is cheap: successful prompts are answered from the response cache,
+        so only these submissions are sent to the API again.
+        """
+        failures_file = Path(output_dir) / FAILURES_FILE_NAME
+
+        if not failures:
+            failures_file.unlink(missing_ok=True)
+            return
+
+        with open(failures_file, 'wb') as f:
+            for docx_file, error in failures:
+                f.write(orjson.dumps({"student_file": docx_file.name, "error": error},
+                                     option=orjson.OPT_APPEND_NEWLINE))
+
+        print(f"⚠️  {len(failures)} assignment(s) failed; see {failures_file}")
+
+    def _report_saved(self, output_dir: str) -> None:
+        """Print where this run's results were written."""
+        print(f"✓ All evaluations saved to: {output_dir}")
+        print(f"✓ Summary saved to: {Path(output_dir) / SUMMARY_FILE_NAME}")
 
 
 def main():
     """Main function to run the automated scoring."""
+    parser = argparse.ArgumentParser(description="Automated Assignment Scoring System")
+    parser.add_argument("--batch", action="store_true",
+                        help="Submit all assignments as one Message Batch (50%% cheaper, results can take up to 24h)")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("Automated Assignment Scoring System")
     print("=" * 60)
     print()
 
     scorer = AssignmentScorer()
-    results = scorer.score_all_assignments()
+    if args.batch:
+        results = scorer.score_all_assignments_batched()
+    else:
+        results = scorer.score_all_assignments()
+
+    scorer.close()
 
     print()
     print(f"Completed! Evaluated {len(results)} assignment(s).")
@@ -4,40 +4,93 @@ View Assignment Evaluation Results in Table Format
 This script displays evaluation results from JSON files in a formatted table.
 """
 
-import json
+import csv
+import gzip
 import os
+import textwrap
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+import orjson
+
+
+# Written by automate_scoring.py, one evaluation per line
+SUMMARY_FILE_NAME = "all_evaluations.jsonl"
+# Gzip-compressed raw AI responses written by automate_scoring.py
+RAW_DIR_NAME = "raw"
+# Category columns of the CSV export, in order
+CSV_CATEGORIES = ("prompt_clarity", "real_world_relevance", "reflection_quality", "responsible_use", "writing_clarity")
 
 
 def load_evaluation_results(results_dir: str = "evaluation-results") -> List[Dict[str, Any]]:
-    """Load all evaluation JSON files from the results directory."""
+    """Load evaluations from the run summary plus any individual JSON files it doesn't cover."""
     results_path = Path(results_dir)
 
     if not results_path.exists():
         print(f"Error: Directory '{results_dir}' not found.")
         return []
 
+    # The summary is rewritten each run, so students that failed or aren't done yet
+    # in the latest run only have their individual files
+    summary_file = results_path / SUMMARY_FILE_NAME
+    evaluations = load_summary_jsonl(summary_file) if summary_file.exists() else []
+    summarized = {e['file_name'] for e in evaluations}
+
     # Find all individual evaluation files (not the summary)
-    json_files = [f for f in results_path.glob("*_evaluation.json")]
+    json_files = [f for f in results_path.glob("*_evaluation.json")
+                  if f.stem.replace('_evaluation', '') not in summarized]
 
-    if not json_files:
+    if not evaluations and not json_files:
         print(f"No evaluation files found in '{results_dir}'")
         return []
 
-    evaluations = []
     for json_file in sorted(json_files):
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                data['file_name'] = json_file.stem.replace('_evaluation', '')
-                evaluations.append(data)
+            data = orjson.loads(json_file.read_bytes())
+            data['file_name'] = json_file.stem.replace('_evaluation', '')
+            evaluations.append(data)
         except Exception as e:
             print(f"Error loading {json_file}: {e}")
 
+    # Summary lines are written in completion order; sort everything by student
+    evaluations.sort(key=lambda e: e['file_name'])
     return evaluations
 
 
+def load_summary_jsonl(summary_file: Path) -> List[Dict[str, Any]]:
+    """Load evaluations streamed to the JSONL run summary, one per line, in file order."""
+    evaluations = []
+    with open(summary_file, 'rb') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                data = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                print(f"Error loading {summary_file} line {line_number}: {e}")
+                continue
+            student_file = data.get('metadata', {}).get('student_file', 'Unknown')
+            data['file_name'] = Path(student_file).stem
+            evaluations.append(data)
+
+    return evaluations
+
+
+def load_raw_response(eval_data: Dict[str, Any], results_dir: str = "evaluation-results") -> str:
+    """Return the raw AI response for an evaluation, reading the compressed copy if needed."""
+    # Evaluations saved before raw responses moved to raw/ still carry them inline
+    if 'raw_response' in eval_data:
+        return eval_data['raw_response']
+
+    raw_file = Path(results_dir) / RAW_DIR_NAME / f"{eval_data.get('file_name', '')}.txt.gz"
+    if not raw_file.exists():
+        return "No raw response available"
+
+    with gzip.open(raw_file, 'rt', encoding='utf-8') as f:
+        return f.read()
+
+
 def display_summary_table(evaluations: List[Dict[str, Any]]):
     """Display a summary table of all evaluations."""
     if not evaluations:
@@ -73,8 +126,16 @@ def display_summary_table(evaluations: List[Dict[str, Any]]):
     print()
 
 
-def display_detailed_view(evaluations: List[Dict[str, Any]]):
-    """Display detailed view of each evaluation."""
+def print_wrapped(text: str, width: int = 95):
+    """Print text word-wrapped to `width` columns with a two-space indent."""
+    if text.strip():
+        print(textwrap.fill(text, width=width, initial_indent="  ", subsequent_indent="  ",
+                            break_long_words=False, break_on_hyphens=False))
+
+
+def display_detailed_view(evaluations: List[Dict[str, Any]], with_raw: bool = False,
+                          results_dir: str = "evaluation-results"):
+    """Display detailed view of each evaluation, optionally including the raw AI response."""
     for i, eval_data in enumerate(evaluations, 1):
         student = eval_data.get('file_name', 'Unknown')
         metadata = eval_data.get('metadata', {})
@@ -95,39 +156,32 @@ def display_detailed_view(evaluations: List[Dict[str, Any]]):
 
         # Summary Feedback
         print("\nSummary Feedback:")
-        feedback = eval_data.get('summary_feedback', 'No feedback available')
-        # Word wrap the feedback
-        words = feedback.split()
-        line = ""
-        for word in words:
-            if len(line) + len(word) + 1 <= 95:
-                line += word + " "
-            else:
-                print(f"  {line.strip()}")
-                line = word + " "
-        if line:
-            print(f"  {line.strip()}")
+        print_wrapped(eval_data.get('summary_feedback', 'No feedback available'))
 
         # Improvement Suggestion
         print("\nImprovement Suggestion:")
-        suggestion = eval_data.get('improvement_suggestion', 'No suggestion available')
-        # Word wrap the suggestion
-        words = suggestion.split()
-        line = ""
-        for word in words:
-            if len(line) + len(word) + 1 <= 95:
-                line += word + " "
-            else:
-                print(f"  {line.strip()}")
-                line = word + " "
-        if line:
-            print(f"  {line.strip()}")
+        print_wrapped(eval_data.get('improvement_suggestion', 'No suggestion available'))
+
+        # Raw AI response
+        if with_raw:
+            print("\nRaw Response:")
+            for raw_line in load_raw_response(eval_data, results_dir).splitlines():
+                print(f"  {raw_line}")
 
         # Metadata
         print(f"\nEvaluation Date: {metadata.get('evaluation_date', 'Unknown')}")
         print()
 
 
+def parse_total_score(eval_data: Dict[str, Any]) -> Optional[int]:
+    """Return the numeric total from a "15 / 25" score string, or None if it can't be parsed."""
+    total_str = eval_data.get('total_score', '0 / 25')
+    try:
+        return int(total_str.split('/')[0].strip())
+    except (ValueError, AttributeError):
+        return None
+
+
 def display_statistics(evaluations: List[Dict[str, Any]]):
     """Display statistics about the evaluations."""
     if not evaluations:
@@ -139,32 +193,21 @@ def display_statistics(evaluations: List[Dict[str, Any]]):
     print()
 
     # Extract total scores
-    scores = []
-    for eval_data in evaluations:
-        total_str = eval_data.get('total_score', '0 / 25')
-        try:
-            score_num = int(total_str.split('/')[0].strip())
-            scores.append(score_num)
-        except:
-            continue
-
-    if scores:
-        avg_score = sum(scores) / len(scores)
-        max_score = max(scores)
-        min_score = min(scores)
+    scores = np.fromiter(
+        (score for score in map(parse_total_score, evaluations) if score is not None),
+        dtype=np.int32
+    )
 
+    if scores.size:
         print(f"Total Assignments: {len(evaluations)}")
-        print(f"Average Score: {avg_score:.1f} / 25")
-        print(f"Highest Score: {max_score} / 25")
-        print(f"Lowest Score: {min_score} / 25")
+        print(f"Average Score: {scores.mean():.1f} / 25")
+        print(f"Highest Score: {scores.max()} / 25")
+        print(f"Lowest Score: {scores.min()} / 25")
         print()
 
-        # Score distribution
+        # Score distribution: bins are 0-10, 11-17, 18-22 and 23-25
         print("Score Distribution:")
-        developing = sum(1 for s in scores if s <= 10)
-        progressing = sum(1 for s in scores if 11 <= s <= 17)
-        strong = sum(1 for s in scores if 18 <= s <= 22)
-        excellent = sum(1 for s in scores if s >= 23)
+        developing, progressing, strong, excellent = np.bincount(np.digitize(scores, [11, 18, 23]), minlength=4)
 
         print(f"  0-10  (Developing):       {developing} student(s)")
         print(f"  11-17 (Progressing Well): {progressing} student(s)")
@@ -176,19 +219,21 @@ def display_statistics(evaluations: List[Dict[str, Any]]):
 def export_to_csv(evaluations: List[Dict[str, Any]], output_file: str = "evaluation-results/summary.csv"):
     """Export results to CSV file."""
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            # Header
-            f.write("Student,Total Score,Prompt Clarity,Real-World Relevance,Reflection Quality,Responsible Use,Writing Clarity,Evaluation Date\n")
-
-            # Rows
-            for eval_data in evaluations:
-                student = eval_data.get('metadata', {}).get('student_file', eval_data.get('file_name', 'Unknown'))
-                total = eval_data.get('total_score', 'N/A')
-                breakdown = eval_data.get('category_breakdown', {})
-                date = eval_data.get('metadata', {}).get('evaluation_date', 'Unknown')
-
-                row = f"{student},{total},{breakdown.get('prompt_clarity', 'N/A')},{breakdown.get('real_world_relevance', 'N/A')},{breakdown.get('reflection_quality', 'N/A')},{breakdown.get('responsible_use', 'N/A')},{breakdown.get('writing_clarity', 'N/A')},{date}\n"
-                f.write(row)
+        with open(output_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Student", "Total Score", "Prompt Clarity", "Real-World Relevance",
+                             "Reflection Quality", "Responsible Use", "Writing Clarity", "Evaluation Date"])
+
+            # csv quotes any field containing commas, quotes or newlines
+            writer.writerows(
+                (
+                    eval_data.get('metadata', {}).get('student_file', eval_data.get('file_name', 'Unknown')),
+                    eval_data.get('total_score', 'N/A'),
+                    *(eval_data.get('category_breakdown', {}).get(category, 'N/A') for category in CSV_CATEGORIES),
+                    eval_data.get('metadata', {}).get('evaluation_date', 'Unknown')
+                )
+                for eval_data in evaluations
+            )
 
         print(f"✓ Results exported to: {output_file}")
     except Exception as e:
@@ -211,12 +256,15 @@ def main():
         return
 
     # Check for command line arguments
+    with_raw = "--with-raw" in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != "--with-raw"]
+
     view_mode = "summary"
-    if len(sys.argv) > 1:
-        view_mode = sys.argv[1].lower()
+    if args:
+        view_mode = args[0].lower()
 
     if view_mode == "detailed" or view_mode == "-d":
-        display_detailed_view(evaluations)
+        display_detailed_view(evaluations, with_raw)
     elif view_mode == "stats" or view_mode == "-s":
         display_statistics(evaluations)
     elif view_mode == "csv" or view_mode == "-c":
@@ -225,7 +273,7 @@ def main():
     elif view_mode == "all" or view_mode == "-a":
         display_summary_table(evaluations)
         display_statistics(evaluations)
-        display_detailed_view(evaluations)
+        display_detailed_view(evaluations, with_raw)
         export_to_csv(evaluations)
     else:
         # Default: summary table + statistics